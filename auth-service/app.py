@@ -4,33 +4,70 @@ Handles Google OAuth authentication and JWT token management
 """
 import os
 import jwt
-import json
+import hmac
+import base64
+import hashlib
+import orjson
+import logging
 import requests
+import threading
 import time
-from datetime import datetime, timedelta
-from flask import Flask, request, jsonify, redirect, session
+from collections import OrderedDict
+from http.cookiejar import DefaultCookiePolicy
+from pathlib import Path
+from secrets import token_urlsafe
+from types import MappingProxyType
+from urllib.parse import urlencode
+from flask import Flask, Response, request, jsonify, redirect, session
 from functools import wraps
+from requests.adapters import HTTPAdapter
 from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
 
 # Simple in-memory state store for OAuth state management
 # In production, use Redis or a proper database
-oauth_states = {}
+# Maps each state to its expiry time; states are single use and removed on verify
+OAUTH_STATE_TTL = 600  # 10 minutes expiry
+OAUTH_STATE_SWEEP_INTERVAL = 60
+MAX_OAUTH_STATES = 10000
+oauth_states = OrderedDict()
+oauth_states_lock = threading.Lock()
+
+# Process-local cache of verified JWT payloads, keyed by token hash
+# Entries are evicted once the token's exp claim has passed
+JWT_CACHE_MAX_SIZE = 4096
+jwt_cache = OrderedDict()
+jwt_cache_lock = threading.Lock()
+jwt_cache_stats = {'hits': 0, 'misses': 0}
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
+log = logging.getLogger(__name__)
 
 # Load configuration from config.json
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.json'
+
 def load_config():
     """Load configuration from config.json file"""
-    config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config.json')
     try:
-        with open(config_path, 'r') as f:
-            return json.load(f)
+        return orjson.loads(CONFIG_PATH.read_bytes())
     except FileNotFoundError:
         print("❌ Error: config.json not found. Copy config.sample.json to config.json and update with your credentials.")
         exit(1)
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         print("❌ Error: Invalid JSON in config.json")
         exit(1)
 
@@ -49,6 +86,16 @@ app.config.update(
     SESSION_COOKIE_SAMESITE='Lax',
 )
 
+# Optional Redis for rate-limit counters. Sessions stay in signed cookies: the frontend calls
+# /auth/login server-to-server and drops its cookies, so server-side sessions would never be read back
+REDIS_URL = os.environ.get("REDIS_URL", config['services'].get('redis_url'))
+
+# Rate limit login starts so a single source cannot flood the OAuth state store
+# Browser logins arrive via the frontend, which applies its own per-client limit,
+# so this is a backstop with headroom for the frontend's combined traffic
+LOGIN_RATE_LIMIT = os.environ.get("LOGIN_RATE_LIMIT", "300/minute")
+limiter = Limiter(get_remote_address, app=app, default_limits=[], storage_uri=REDIS_URL or 'memory://')
+
 # Google OAuth config from config.json
 CLIENT_ID = config['google_oauth']['client_id']
 CLIENT_SECRET = config['google_oauth']['client_secret']
@@ -57,122 +104,205 @@ AUTH_URI = config['google_oauth']['auth_uri']
 TOKEN_URI = config['google_oauth']['token_uri']
 SCOPE = config['google_oauth']['scope']
 
+# Static part of the Google authorization URL; only the state varies per login
+AUTH_URL_PREFIX = AUTH_URI + '?' + urlencode({
+    'response_type': 'code',
+    'client_id': CLIENT_ID,
+    'redirect_uri': REDIRECT_URI,
+    'scope': SCOPE,
+    'access_type': 'offline',
+    'prompt': 'consent'
+}) + '&state='
+
+# Shared HTTP session so the TLS connection to Google is reused across callbacks
+# Token exchanges give up after TOKEN_EXCHANGE_TIMEOUT seconds rather than pinning a worker
+TOKEN_EXCHANGE_TIMEOUT = 10
+HTTP = requests.Session()
+HTTP.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+HTTP.mount('https://', HTTPAdapter(pool_connections=20, pool_maxsize=50))
+
+# How long Google's public signing certs are reused before being re-fetched
+GOOGLE_CERTS_TTL = 3600
+
+class CachingGoogleRequest(google_requests.Request):
+    """google-auth transport that reuses Google's public certs between callbacks"""
+
+    def __init__(self, session=None, ttl=GOOGLE_CERTS_TTL):
+        super().__init__(session=session)
+        self.ttl = ttl
+        self.cache = {}
+
+    def __call__(self, url, method='GET', **kwargs):
+        if method != 'GET':
+            return super().__call__(url, method=method, **kwargs)
+
+        cached = self.cache.get(url)
+        if cached and cached[0] > time.time():
+            return cached[1]
+
+        response = super().__call__(url, method=method, **kwargs)
+        if response.status == 200:
+            self.cache[url] = (time.time() + self.ttl, response)
+        return response
+
+GOOGLE_REQUEST = CachingGoogleRequest(session=HTTP)
+
 # Note: Make sure your Google Cloud Console OAuth 2.0 Client has this redirect URI:
 # http://localhost:5001/auth/callback
 
 # Frontend URL for redirects
 FRONTEND_URL = config['services']['frontend_url']
 
-# User roles configuration from config.json
-USER_ROLES = config['user_roles']
+# User roles configuration from config.json, read-only after load
+# Emails are lowercased once here so lookups are case-insensitive
+USER_ROLES = MappingProxyType({email.lower(): role for email, role in config['user_roles'].items()})
 
 def cleanup_expired_states():
     """Clean up expired OAuth states"""
+    # States are kept in insertion order, so the earliest expiries are always first
     current_time = time.time()
-    expired_states = [state for state, data in oauth_states.items() 
-                     if current_time - data['timestamp'] > 600]  # 10 minutes expiry
-    for state in expired_states:
-        del oauth_states[state]
+    with oauth_states_lock:
+        while oauth_states:
+            state, expires_at = next(iter(oauth_states.items()))
+            if expires_at > current_time:
+                break
+            del oauth_states[state]
+
+def sweep_expired_states():
+    """Periodically clean up expired OAuth states off the request path"""
+    while True:
+        time.sleep(OAUTH_STATE_SWEEP_INTERVAL)
+        cleanup_expired_states()
 
 def store_oauth_state(state):
-    """Store OAuth state with timestamp"""
-    cleanup_expired_states()
-    oauth_states[state] = {
-        'timestamp': time.time(),
-        'used': False
-    }
+    """Store OAuth state with its expiry, dropping the oldest past MAX_OAUTH_STATES"""
+    with oauth_states_lock:
+        oauth_states[state] = time.time() + OAUTH_STATE_TTL
+        if len(oauth_states) > MAX_OAUTH_STATES:
+            oauth_states.popitem(last=False)
 
 def verify_oauth_state(state):
     """Verify and consume OAuth state"""
-    cleanup_expired_states()
-    if state in oauth_states and not oauth_states[state]['used']:
-        oauth_states[state]['used'] = True
-        return True
-    return False
+    with oauth_states_lock:
+        expires_at = oauth_states.pop(state, None)
+    return expires_at is not None and expires_at > time.time()
+
+threading.Thread(target=sweep_expired_states, daemon=True).start()
 
 def get_user_role(email):
     """Determine user role based on email"""
-    return USER_ROLES.get(email, 'user')
+    return USER_ROLES.get(email.lower(), 'user') if email else 'user'
+
+def base64url_encode(data):
+    """Base64url-encode bytes without padding, as used in JWTs"""
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+# HS256 header and signing key are fixed, so encode them once
+JWT_HEADER_B64 = base64url_encode(orjson.dumps({'alg': 'HS256', 'typ': 'JWT'}))
+JWT_KEY = JWT_SECRET.encode()
+JWT_TTL = 8 * 3600  # 8 hour expiry
 
 def create_jwt_token(user_info):
-    """Create JWT token for authenticated user"""
+    """Create HS256 JWT token for authenticated user"""
     payload = {
         'sub': user_info['sub'],
         'email': user_info['email'],
         'name': user_info['name'],
         'role': user_info['role'],
         'picture': user_info.get('picture', ''),
-        'exp': datetime.utcnow() + timedelta(hours=8)  # 8 hour expiry
+        'exp': int(time.time()) + JWT_TTL
     }
-    return jwt.encode(payload, JWT_SECRET, algorithm='HS256')
+    signing_input = JWT_HEADER_B64 + b'.' + base64url_encode(orjson.dumps(payload))
+    signature = hmac.new(JWT_KEY, signing_input, hashlib.sha256).digest()
+    return (signing_input + b'.' + base64url_encode(signature)).decode()
 
 def verify_jwt_token(token):
-    """Verify and decode JWT token"""
+    """Verify and decode JWT token, serving repeat tokens from the cache"""
+    key = hashlib.sha256(token.encode()).digest()
+    with jwt_cache_lock:
+        payload = jwt_cache.get(key)
+        if payload is not None:
+            if payload['exp'] > time.time():
+                jwt_cache.move_to_end(key)
+                jwt_cache_stats['hits'] += 1
+                return payload
+            del jwt_cache[key]
+        jwt_cache_stats['misses'] += 1
+
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
-        return payload
+        payload = jwt.decode(token, JWT_SECRET, algorithms=['HS256'], options={'require': ['exp']})
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
 
+    with jwt_cache_lock:
+        jwt_cache[key] = payload
+        if len(jwt_cache) > JWT_CACHE_MAX_SIZE:
+            jwt_cache.popitem(last=False)
+    return payload
+
+# Static response bodies, serialized once at startup
+HEALTH_JSON = orjson.dumps({'status': 'healthy', 'service': 'auth-service'})
+AUTH_CONFIG_JSON = orjson.dumps({
+    'client_id': CLIENT_ID,
+    'redirect_uri': REDIRECT_URI,
+    'auth_uri': AUTH_URI,
+    'token_uri': TOKEN_URI,
+    'scope': SCOPE,
+    'frontend_url': FRONTEND_URL
+})
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'service': 'auth-service'})
+    return Response(HEALTH_JSON, mimetype='application/json')
 
 @app.route('/auth/config', methods=['GET'])
 def get_auth_config():
     """Get OAuth configuration for debugging"""
-    return jsonify({
-        'client_id': CLIENT_ID,
-        'redirect_uri': REDIRECT_URI,
-        'auth_uri': AUTH_URI,
-        'token_uri': TOKEN_URI,
-        'scope': SCOPE,
-        'frontend_url': FRONTEND_URL
-    })
+    return Response(AUTH_CONFIG_JSON, mimetype='application/json',
+                    headers={'Cache-Control': 'public, max-age=300'})
 
 @app.route('/auth/debug', methods=['GET'])
 def debug_oauth():
     """Debug OAuth state for troubleshooting"""
     cleanup_expired_states()
+    with oauth_states_lock:
+        stored_states = list(oauth_states.keys())
     return jsonify({
-        'stored_states_count': len(oauth_states),
-        'stored_states': list(oauth_states.keys()),
+        'stored_states_count': len(stored_states),
+        'stored_states': stored_states,
         'session_has_state': 'oauth_state' in session,
-        'session_state': session.get('oauth_state', 'None')
+        'session_state': session.get('oauth_state', 'None'),
+        'jwt_cache_size': len(jwt_cache),
+        'jwt_cache_hits': jwt_cache_stats['hits'],
+        'jwt_cache_misses': jwt_cache_stats['misses']
     })
 
 @app.route('/auth/clear', methods=['POST'])
 def clear_oauth_state():
     """Clear all OAuth states for troubleshooting"""
-    global oauth_states
-    oauth_states.clear()
+    with oauth_states_lock:
+        oauth_states.clear()
     session.clear()
     return jsonify({'message': 'OAuth states cleared', 'success': True})
 
 @app.route('/auth/login', methods=['GET'])
+@limiter.limit(LOGIN_RATE_LIMIT)
 def initiate_login():
     """Initiate Google OAuth login"""
-    state = os.urandom(32).hex()  # Longer state for better security
+    state = token_urlsafe(32)  # 256 bits, URL-safe without hex doubling
     store_oauth_state(state)
     
     # Also store in session as backup
     session['oauth_state'] = state
     
-    auth_url = (
-        f"{AUTH_URI}?response_type=code"
-        f"&client_id={CLIENT_ID}"
-        f"&redirect_uri={REDIRECT_URI}"
-        f"&scope={SCOPE}"
-        f"&state={state}"
-        f"&access_type=offline"
-        f"&prompt=consent"
-    )
+    # State from token_urlsafe needs no further escaping
+    auth_url = AUTH_URL_PREFIX + state
     
-    print(f"Generated OAuth state: {state}")
-    print(f"Auth URL: {auth_url}")
+    log.debug("Generated OAuth state: %s", state)
+    log.debug("Auth URL: %s", auth_url)
     
     return jsonify({'auth_url': auth_url})
 
@@ -181,15 +311,16 @@ def oauth_callback():
     """Handle OAuth callback from Google"""
     try:
         # Debug logging
-        print(f"Callback received with args: {request.args}")
+        log.debug("Callback received with args: %s", request.args)
         
         # Get state parameter
         state = request.args.get('state')
-        session_state = session.get('oauth_state')
+        # Consume the session copy up front so it is single use, like the stored state
+        session_state = session.pop('oauth_state', None)
         
-        print(f"State from request: {state}")
-        print(f"State from session: {session_state}")
-        print(f"Stored states count: {len(oauth_states)}")
+        log.debug("State from request: %s", state)
+        log.debug("State from session: %s", session_state)
+        log.debug("Stored states count: %d", len(oauth_states))
         
         # Verify state using both methods
         state_valid = False
@@ -197,23 +328,22 @@ def oauth_callback():
             # Primary method: check against stored states
             if verify_oauth_state(state):
                 state_valid = True
-                print("State verified using stored states")
+                log.debug("State verified using stored states")
             # Backup method: check against session
             elif state == session_state:
                 state_valid = True
-                print("State verified using session backup")
+                log.debug("State verified using session backup")
         
         if not state_valid:
-            print("State mismatch detected!")
-            print(f"Available states: {list(oauth_states.keys())}")
+            log.warning("State mismatch detected!")
             return redirect(f"{FRONTEND_URL}/login?error=state_mismatch")
 
         code = request.args.get('code')
         if not code:
-            print("No authorization code received")
+            log.warning("No authorization code received")
             return redirect(f"{FRONTEND_URL}/login?error=no_code")
         
-        print(f"Authorization code received: {code[:20]}...")
+        log.debug("Authorization code received: %s...", code[:20])
 
         # Exchange code for tokens
         data = {
@@ -224,26 +354,26 @@ def oauth_callback():
             'grant_type': 'authorization_code',
         }
         
-        print(f"Exchanging code for tokens with redirect_uri: {REDIRECT_URI}")
-        token_response = requests.post(TOKEN_URI, data=data)
-        print(f"Token response status: {token_response.status_code}")
+        log.debug("Exchanging code for tokens with redirect_uri: %s", REDIRECT_URI)
+        token_response = HTTP.post(TOKEN_URI, data=data, timeout=TOKEN_EXCHANGE_TIMEOUT)
+        log.debug("Token response status: %s", token_response.status_code)
         
         if token_response.status_code != 200:
-            print(f"Token exchange failed: {token_response.text}")
+            log.warning("Token exchange failed: %s", token_response.text)
             return redirect(f"{FRONTEND_URL}/login?error=token_exchange_failed")
         
-        tokens = token_response.json()
-        print("Tokens received successfully")
+        tokens = orjson.loads(token_response.content)
+        log.debug("Tokens received successfully")
 
         # Verify ID token
         try:
             idinfo = id_token.verify_oauth2_token(
-                tokens['id_token'], google_requests.Request(), CLIENT_ID,
+                tokens['id_token'], GOOGLE_REQUEST, CLIENT_ID,
                 clock_skew_in_seconds=60
             )
-            print(f"ID token verified for user: {idinfo.get('email')}")
+            log.debug("ID token verified for user: %s", idinfo.get('email'))
         except ValueError as e:
-            print(f"ID token verification failed: {e}")
+            log.warning("ID token verification failed: %s", e)
             return redirect(f"{FRONTEND_URL}/login?error=invalid_token")
 
         # Create user info with role
@@ -260,18 +390,13 @@ def oauth_callback():
 
         # Create JWT token
         jwt_token = create_jwt_token(user_info)
-        print(f"JWT token created for user: {user_email}")
-        
-        # Clear session state
-        session.pop('oauth_state', None)
+        log.debug("JWT token created for user: %s", user_email)
         
         # Redirect to frontend with token
         return redirect(f"{FRONTEND_URL}/auth/success?token={jwt_token}")
         
     except Exception as e:
-        print(f"OAuth callback error: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("OAuth callback error: %s", e)
         return redirect(f"{FRONTEND_URL}/login?error=internal_error")
 
 @app.route('/auth/verify', methods=['POST'])
@@ -290,6 +415,7 @@ def verify_token():
         
         return jsonify({
             'valid': True,
+            'exp': payload['exp'],
             'user': {
                 'sub': payload['sub'],
                 'email': payload['email'],
@@ -331,5 +457,6 @@ def refresh_token():
         return jsonify({'error': 'Token refresh failed'}), 500
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG)
     print("Starting Auth Service on port 5001")
     app.run(debug=True, port=5001)
@@ -0,0 +1,15 @@
+"""
+Gunicorn configuration for the Auth Service
+Run with: gunicorn -c gunicorn_conf.py app:app
+"""
+bind = '127.0.0.1:5001'
+
+# Pending OAuth states live in process memory, so a login's callback must reach the
+# worker that issued its state; a single worker keeps every request in one process
+workers = 1
+
+# gevent workers monkey-patch the standard library before the app is loaded,
+# so outbound HTTP calls (Google token exchange) yield instead of blocking the worker
+worker_class = 'gevent'
+worker_connections = 1000
+keepalive = 5
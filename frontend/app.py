@@ -3,24 +3,44 @@ Frontend Service
 Serves the UI and handles user interactions
 """
 import os
-import json
+import hashlib
+import orjson
 import requests
+import threading
+import time
+from collections import OrderedDict
+from http.cookiejar import DefaultCookiePolicy
+from pathlib import Path
+from requests.adapters import HTTPAdapter
 from flask import Flask, render_template, request, redirect, url_for, session, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 
 # Load configuration from config.json
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.json'
+
 def load_config():
     """Load configuration from config.json file"""
-    config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config.json')
     try:
-        with open(config_path, 'r') as f:
-            return json.load(f)
+        return orjson.loads(CONFIG_PATH.read_bytes())
     except FileNotFoundError:
         print("❌ Error: config.json not found. Copy config.sample.json to config.json and update with your credentials.")
         exit(1)
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         print("❌ Error: Invalid JSON in config.json")
         exit(1)
 
@@ -29,13 +49,48 @@ config = load_config()
 CORS(app)
 app.secret_key = os.environ.get("FLASK_SECRET", config['security']['flask_secret'])
 
+# Optional Redis-backed server-side sessions; the cookie then only carries a session id
+REDIS_URL = os.environ.get("REDIS_URL", config['services'].get('redis_url'))
+if REDIS_URL:
+    import redis
+    from flask_session import Session
+
+    app.config.update(
+        SESSION_TYPE='redis',
+        SESSION_REDIS=redis.from_url(REDIS_URL),
+        SESSION_USE_SIGNER=True,
+        SESSION_KEY_PREFIX='frontend-session:',
+    )
+    Session(app)
+
+# Rate limit login starts per client; the auth service's state store grows with each one
+LOGIN_RATE_LIMIT = os.environ.get("LOGIN_RATE_LIMIT", "20/minute")
+limiter = Limiter(get_remote_address, app=app, default_limits=[], storage_uri=REDIS_URL or 'memory://')
+
 # Service URLs from config
 AUTH_SERVICE_URL = config['services']['auth_service_url']
 RESOURCE_SERVICE_URL = config['services']['resource_service_url']
 
+# Process-local cache of successful token verifications, keyed by token hash
+# Entries live for VERIFY_CACHE_TTL seconds, never past the token's own expiry
+VERIFY_CACHE_TTL = 60
+VERIFY_CACHE_MAX_SIZE = 4096
+verify_cache = OrderedDict()
+verify_cache_lock = threading.Lock()
+
+# How long a verified session skips the auth service round trip
+SESSION_VERIFY_TTL = 30
+
 class APIClient:
     """Client for communicating with backend services"""
     
+    # Shared keep-alive session, reused by every call to the backend services
+    # Cookies are never stored, so nothing leaks between users' requests
+    _session = requests.Session()
+    _session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    _session.mount('http://', HTTPAdapter(pool_connections=20, pool_maxsize=50))
+    _session.mount('https://', HTTPAdapter(pool_connections=20, pool_maxsize=50))
+    
     @staticmethod
     def call_auth_service(endpoint, method='GET', data=None, token=None):
         """Make API call to auth service"""
@@ -46,12 +101,12 @@ class APIClient:
         
         try:
             if method == 'GET':
-                response = requests.get(url, headers=headers)
+                response = APIClient._session.get(url, headers=headers)
             elif method == 'POST':
                 headers['Content-Type'] = 'application/json'
-                response = requests.post(url, json=data, headers=headers)
+                response = APIClient._session.post(url, json=data, headers=headers)
             
-            return response.json() if response.status_code < 400 else None
+            return orjson.loads(response.content) if response.status_code < 400 else None
         except Exception as e:
             print(f"Auth service call failed: {e}")
             return None
@@ -66,22 +121,61 @@ class APIClient:
         
         try:
             if method == 'GET':
-                response = requests.get(url, headers=headers)
+                response = APIClient._session.get(url, headers=headers)
             
-            return response.json() if response.status_code < 400 else None
+            return orjson.loads(response.content) if response.status_code < 400 else None
         except Exception as e:
             print(f"Resource service call failed: {e}")
             return None
 
+def verify_token(token):
+    """Verify token with auth service, reusing recent results for the same token"""
+    key = hashlib.sha256(token.encode()).digest()
+    now = time.time()
+    with verify_cache_lock:
+        entry = verify_cache.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if expires_at > now:
+                verify_cache.move_to_end(key)
+                return result
+            del verify_cache[key]
+
+    result = APIClient.call_auth_service('/auth/verify', 'POST', {'token': token})
+    if not result or not result.get('valid'):
+        return None
+
+    expires_at = min(now + VERIFY_CACHE_TTL, result.get('exp', now))
+    with verify_cache_lock:
+        verify_cache[key] = (expires_at, result)
+        if len(verify_cache) > VERIFY_CACHE_MAX_SIZE:
+            verify_cache.popitem(last=False)
+    return result
+
+def mark_session_verified(result):
+    """Record a successful verification in the signed session cookie"""
+    session['user'] = result['user']
+    session['verified_until'] = min(time.time() + SESSION_VERIFY_TTL, result.get('exp', 0))
+
+def session_token_valid():
+    """Check the session token, calling the auth service at most once per SESSION_VERIFY_TTL"""
+    token = session.get('token')
+    if not token:
+        return False
+    if time.time() < session.get('verified_until', 0):
+        return True
+
+    result = verify_token(token)
+    if not result:
+        return False
+    mark_session_verified(result)
+    return True
+
 @app.route('/')
 def index():
     """Home page - redirect based on authentication status"""
-    token = session.get('token')
-    if token:
-        # Verify token with auth service
-        result = APIClient.call_auth_service('/auth/verify', 'POST', {'token': token})
-        if result and result.get('valid'):
-            return redirect(url_for('dashboard'))
+    if session_token_valid():
+        return redirect(url_for('dashboard'))
     
     return redirect(url_for('login'))
 
@@ -94,12 +188,14 @@ def login():
         'no_code': 'Authentication was cancelled or failed.',
         'token_exchange_failed': 'Failed to complete authentication with Google.',
         'invalid_token': 'Authentication token is invalid.',
-        'internal_error': 'An internal error occurred during authentication.'
+        'internal_error': 'An internal error occurred during authentication.',
+        'rate_limited': 'Too many sign-in attempts. Please wait a minute and try again.'
     }.get(error, '')
     
     return render_template('login.html', error=error_message)
 
 @app.route('/auth/initiate')
+@limiter.limit(LOGIN_RATE_LIMIT)
 def initiate_auth():
     """Initiate authentication with auth service"""
     result = APIClient.call_auth_service('/auth/login')
@@ -116,13 +212,13 @@ def auth_success():
         return redirect(url_for('login', error='no_token'))
     
     # Verify token
-    result = APIClient.call_auth_service('/auth/verify', 'POST', {'token': token})
-    if not result or not result.get('valid'):
+    result = verify_token(token)
+    if not result:
         return redirect(url_for('login', error='invalid_token'))
     
     # Store token in session
     session['token'] = token
-    session['user'] = result['user']
+    mark_session_verified(result)
     
     return redirect(url_for('dashboard'))
 
@@ -136,8 +232,7 @@ def dashboard():
         return redirect(url_for('login'))
     
     # Verify token is still valid
-    result = APIClient.call_auth_service('/auth/verify', 'POST', {'token': token})
-    if not result or not result.get('valid'):
+    if not session_token_valid():
         session.clear()
         return redirect(url_for('login', error='session_expired'))
     
@@ -163,7 +258,7 @@ def get_admin_resources():
         return jsonify({'error': 'Not authenticated'}), 401
     
     result = APIClient.call_resource_service('/resources/admin', token=token)
-    return jsonify(result) if result else jsonify({'error': 'Service unavailable'}), 503
+    return jsonify(result) if result else (jsonify({'error': 'Service unavailable'}), 503)
 
 @app.route('/api/user/profile')
 def get_user_profile():
@@ -183,7 +278,7 @@ def get_admin_stats():
         return jsonify({'error': 'Not authenticated'}), 401
     
     result = APIClient.call_resource_service('/admin/stats', token=token)
-    return jsonify(result) if result else jsonify({'error': 'Service unavailable'}), 503
+    return jsonify(result) if result else (jsonify({'error': 'Service unavailable'}), 503)
 
 @app.route('/api/admin/users')
 def get_admin_users():
@@ -193,7 +288,12 @@ def get_admin_users():
         return jsonify({'error': 'Not authenticated'}), 401
     
     result = APIClient.call_resource_service('/admin/users', token=token)
-    return jsonify(result) if result else jsonify({'error': 'Service unavailable'}), 503
+    return jsonify(result) if result else (jsonify({'error': 'Service unavailable'}), 503)
+
+@app.errorhandler(429)
+def rate_limited(e):
+    """Send rate-limited logins back to the login page"""
+    return redirect(url_for('login', error='rate_limited'))
 
 @app.route('/logout')
 def logout():
@@ -0,0 +1,16 @@
+"""
+Gunicorn configuration for the Frontend Service
+Run with: gunicorn -c gunicorn_conf.py app:app
+"""
+import multiprocessing
+
+bind = '127.0.0.1:3000'
+
+# Login rate-limit counters are per worker unless REDIS_URL is set
+workers = multiprocessing.cpu_count() * 2 + 1
+
+# gevent workers monkey-patch the standard library before the app is loaded,
+# so outbound HTTP calls (auth and resource service calls) yield instead of blocking the worker
+worker_class = 'gevent'
+worker_connections = 1000
+keepalive = 5
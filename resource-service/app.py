@@ -4,290 +4,385 @@ Handles protected resources with role-based access control
 """
 import os
 import jwt
-import json
-from datetime import datetime
-from functools import wraps
-from flask import Flask, request, jsonify
+import hashlib
+import orjson
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from pathlib import Path
+from functools import lru_cache, wraps
+from flask import Flask, Response, g, request
 from flask_cors import CORS
 
 app = Flask(__name__)
 
 # Load configuration from config.json
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.json'
+
 def load_config():
-    """Load configuration from config.json file"""
-    config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config.json')
+    """Load configuration from the environment or config.json file"""
+    # JWT_SECRET is the only setting this service needs, so skip the file when it is set
+    jwt_secret = os.environ.get("JWT_SECRET")
+    if jwt_secret:
+        return {'security': {'jwt_secret': jwt_secret}}
+
     try:
-        with open(config_path, 'r') as f:
-            return json.load(f)
+        return orjson.loads(CONFIG_PATH.read_bytes())
     except FileNotFoundError:
         print("❌ Error: config.json not found. Copy config.sample.json to config.json and update with your credentials.")
         exit(1)
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         print("❌ Error: Invalid JSON in config.json")
         exit(1)
 
 config = load_config()
 
-CORS(app)  # Enable CORS for frontend communication
+# Enable CORS for frontend communication on the API routes and /health (polled by the login page);
+# browsers cache preflights for a day
+CORS(app, resources={
+    r"/health": {"origins": "*"},
+    r"/resources/*": {"origins": "*"},
+    r"/user/*": {"origins": "*"},
+    r"/admin/*": {"origins": "*"}
+}, max_age=86400)
 
 # Configuration
 JWT_SECRET = os.environ.get("JWT_SECRET", config['security']['jwt_secret'])
 
+# Process-local cache of verified JWT payloads, keyed by token hash
+# Entries are evicted once the token's exp claim has passed
+JWT_CACHE_MAX_SIZE = 4096
+jwt_cache = OrderedDict()
+jwt_cache_lock = threading.Lock()
+
+# Reusable decoder and options; only exp is validated, other registered claims are unused
+JWT_DECODER = jwt.PyJWT()
+JWT_ALGORITHMS = ['HS256']
+JWT_OPTIONS = {
+    'verify_signature': True,
+    'verify_exp': True,
+    'verify_aud': False,
+    'verify_iss': False,
+    'require': ['exp']
+}
+
 # Sample data stores (in production, use a proper database)
+Resource = namedtuple('Resource', 'id title content type created_at sensitive')
+
 RESOURCES = {
-    'user_documents': [
-        {
-            'id': 1,
-            'title': 'Personal Document 1',
-            'content': 'This is a user-accessible document.',
-            'type': 'document',
-            'created_at': '2025-01-01T10:00:00Z'
-        },
-        {
-            'id': 2,
-            'title': 'User Report',
-            'content': 'Monthly user activity report.',
-            'type': 'report',
-            'created_at': '2025-01-15T14:30:00Z'
-        },
-        {
-            'id': 3,
-            'title': 'Project Files',
-            'content': 'Access to your project files and documents.',
-            'type': 'files',
-            'created_at': '2025-01-20T09:15:00Z'
-        }
-    ],
-    'admin_resources': [
-        {
-            'id': 101,
-            'title': 'System Configuration',
-            'content': 'Critical system settings and configurations.',
-            'type': 'config',
-            'created_at': '2025-01-01T09:00:00Z',
-            'sensitive': True
-        },
-        {
-            'id': 102,
-            'title': 'User Management Dashboard',
-            'content': 'Comprehensive user analytics and management tools.',
-            'type': 'dashboard',
-            'created_at': '2025-01-10T11:00:00Z',
-            'sensitive': True
-        },
-        {
-            'id': 103,
-            'title': 'System Logs',
-            'content': 'Access to system logs and audit trails.',
-            'type': 'logs',
-            'created_at': '2025-01-25T16:45:00Z',
-            'sensitive': True
-        }
-    ]
+    'user_documents': (
+        Resource(1, 'Personal Document 1', 'This is a user-accessible document.', 'document', '2025-01-01T10:00:00Z', False),
+        Resource(2, 'User Report', 'Monthly user activity report.', 'report', '2025-01-15T14:30:00Z', False),
+        Resource(3, 'Project Files', 'Access to your project files and documents.', 'files', '2025-01-20T09:15:00Z', False)
+    ),
+    'admin_resources': (
+        Resource(101, 'System Configuration', 'Critical system settings and configurations.', 'config', '2025-01-01T09:00:00Z', True),
+        Resource(102, 'User Management Dashboard', 'Comprehensive user analytics and management tools.', 'dashboard', '2025-01-10T11:00:00Z', True),
+        Resource(103, 'System Logs', 'Access to system logs and audit trails.', 'logs', '2025-01-25T16:45:00Z', True)
+    )
+}
+
+def resource_to_dict(resource, access_level):
+    """Build the JSON form of a resource; sensitive is only listed when set"""
+    data = resource._asdict()
+    if not data['sensitive']:
+        del data['sensitive']
+    data['access_level'] = access_level
+    return data
+
+# Resource lists in their JSON form with access level baked in; only accessible_by varies per request
+USER_RESOURCES = tuple(resource_to_dict(resource, 'user') for resource in RESOURCES['user_documents'])
+ADMIN_RESOURCES = tuple(resource_to_dict(resource, 'admin') for resource in RESOURCES['admin_resources'])
+ALL_RESOURCES = USER_RESOURCES + ADMIN_RESOURCES
+USER_RESOURCE_COUNT = len(USER_RESOURCES)
+ADMIN_RESOURCE_COUNT = len(ADMIN_RESOURCES)
+
+# Profile permissions per role; shared read-only between requests
+USER_PERMISSIONS = {
+    'can_access_user_resources': True,
+    'can_access_admin_resources': False,
+    'can_manage_users': False
+}
+ADMIN_PERMISSIONS = {
+    'can_access_user_resources': True,
+    'can_access_admin_resources': True,
+    'can_manage_users': True
 }
 
+@lru_cache(maxsize=1024)
+def user_info(sub, email, name, picture, role):
+    """Profile user_info block, built once per user and shared read-only between requests"""
+    return {
+        'sub': sub,
+        'email': email,
+        'name': name,
+        'picture': picture,
+        'role': role
+    }
+
 def verify_jwt_token(token):
-    """Verify and decode JWT token"""
+    """Verify and decode JWT token, serving repeat tokens from the cache"""
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    with jwt_cache_lock:
+        payload = jwt_cache.get(key)
+        if payload is not None:
+            if payload['exp'] > time.time():
+                jwt_cache.move_to_end(key)
+                return payload
+            del jwt_cache[key]
+
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
-        return payload
+        payload = JWT_DECODER.decode(token, JWT_SECRET, algorithms=JWT_ALGORITHMS, options=JWT_OPTIONS)
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
 
-def login_required(f):
-    """Decorator to require valid JWT token"""
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'Missing or invalid token'}), 401
-        
-        token = auth_header.split(' ')[1]
-        payload = verify_jwt_token(token)
-        
-        if not payload:
-            return jsonify({'error': 'Invalid or expired token'}), 401
-        
-        request.user = payload
-        return f(*args, **kwargs)
-    return decorated
-
-def admin_required(f):
-    """Decorator to require admin role"""
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        if not hasattr(request, 'user') or request.user.get('role') != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        return f(*args, **kwargs)
-    return decorated
+    with jwt_cache_lock:
+        jwt_cache[key] = payload
+        if len(jwt_cache) > JWT_CACHE_MAX_SIZE:
+            jwt_cache.popitem(last=False)
+    return payload
+
+# Auth error bodies, serialized once; a fresh Response is built per request
+MISSING_TOKEN_BODY = orjson.dumps({'error': 'Missing or invalid token'})
+INVALID_TOKEN_BODY = orjson.dumps({'error': 'Invalid or expired token'})
+
+def error_response(body, status):
+    """JSON error Response from a pre-serialized body"""
+    return Response(body, status=status, mimetype='application/json')
+
+def auth_required(role=None):
+    """Decorator to require a valid JWT token and, optionally, a specific role"""
+    def decorator(f):
+        forbidden_body = orjson.dumps({'error': f'{role.capitalize()} access required'}) if role else None
+
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            # Read the WSGI environ directly rather than going through request.headers
+            auth_header = request.environ.get('HTTP_AUTHORIZATION')
+            if not auth_header or not auth_header.startswith('Bearer '):
+                return error_response(MISSING_TOKEN_BODY, 401)
+            
+            token = auth_header[7:]  # after the 'Bearer ' prefix checked above
+            payload = verify_jwt_token(token)
+            
+            if not payload:
+                return error_response(INVALID_TOKEN_BODY, 401)
+            
+            user_role = payload.get('role', 'user')
+            if role and user_role != role:
+                return error_response(forbidden_body, 403)
+            
+            g.user = payload
+            g.user_role = user_role
+            return f(*args, **kwargs)
+        return decorated
+    return decorator
+
+# Last formatted timestamp and the whole second it represents
+timestamp_cache = (None, None)
+
+def now_iso():
+    """Current UTC time as an ISO 8601 string, formatted at most once per second"""
+    global timestamp_cache
+    timestamp, second = timestamp_cache
+    now = int(time.time())
+    if now != second:
+        timestamp = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(now))
+        timestamp_cache = (timestamp, now)
+    return timestamp
 
 def format_api_response(data, message="Success", status="success"):
-    """Format consistent API responses"""
-    return {
+    """Format consistent API responses as a JSON Response"""
+    return Response(orjson.dumps({
         'status': status,
         'message': message,
         'data': data,
-        'timestamp': datetime.utcnow().isoformat() + 'Z'
-    }
+        'timestamp': now_iso()
+    }), mimetype='application/json')
+
+# Marks where the current timestamp is spliced into pre-serialized responses
+TIMESTAMP_PLACEHOLDER = '@@TIMESTAMP@@'
+
+def static_api_response(data, message="Success", status="success"):
+    """Serialize a fixed API response once, with a placeholder for its timestamp"""
+    return orjson.dumps({
+        'status': status,
+        'message': message,
+        'data': data,
+        'timestamp': TIMESTAMP_PLACEHOLDER
+    })
+
+# Static bodies with the timestamp filled in, keyed by template; reused within the same second
+rendered_static_bodies = {}
+
+def render_static_response(body):
+    """Fill the current timestamp into a response from static_api_response"""
+    timestamp = now_iso()
+    rendered = rendered_static_bodies.get(body)
+    if rendered is None or rendered[0] != timestamp:
+        rendered = (timestamp, body.replace(TIMESTAMP_PLACEHOLDER.encode(), timestamp.encode()))
+        rendered_static_bodies[body] = rendered
+    return Response(rendered[1], mimetype='application/json')
+
+# Bump whenever RESOURCES changes so clients drop their cached listings
+RESOURCES_VERSION = 'v1'
+
+def resource_listing_etag():
+    """ETag for the current user's view of the requested resource listing"""
+    key = f"{request.path}|{g.user['email']}|{g.user_role}|{RESOURCES_VERSION}"
+    return hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
+def with_listing_cache_headers(response, etag):
+    """Mark a resource listing response as privately cacheable under its ETag"""
+    # Weak ETag: the listing is the same but the envelope timestamp changes
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, max-age=30'
+    # The listing depends on the bearer token, so caches must not reuse it across users
+    response.vary.add('Authorization')
+    return response
+
+# Static health check body, serialized once at startup
+HEALTH_JSON = b'{"status":"healthy","service":"resource-service"}'
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'service': 'resource-service'})
+    return Response(HEALTH_JSON, mimetype='application/json')
 
 @app.route('/resources/user', methods=['GET'])
-@login_required
+@auth_required()
 def get_user_resources():
     """Get resources available to regular users"""
-    resources = RESOURCES['user_documents']
+    etag = resource_listing_etag()
+    if request.if_none_match.contains_weak(etag):
+        return with_listing_cache_headers(Response(status=304), etag)
     
-    # Add user-specific metadata
-    enriched_resources = []
-    for resource in resources:
-        enriched_resource = resource.copy()
-        enriched_resource['access_level'] = 'user'
-        enriched_resource['accessible_by'] = request.user['email']
-        enriched_resources.append(enriched_resource)
+    email = g.user['email']
+    enriched_resources = [{**resource, 'accessible_by': email} for resource in USER_RESOURCES]
     
-    return jsonify(format_api_response(
+    response = format_api_response(
         enriched_resources, 
         f"Retrieved {len(enriched_resources)} user resources"
-    ))
+    )
+    return with_listing_cache_headers(response, etag)
 
 @app.route('/resources/admin', methods=['GET'])
-@login_required
-@admin_required
+@auth_required(role='admin')
 def get_admin_resources():
     """Get resources available to admin users"""
-    resources = RESOURCES['admin_resources']
+    etag = resource_listing_etag()
+    if request.if_none_match.contains_weak(etag):
+        return with_listing_cache_headers(Response(status=304), etag)
     
-    # Add admin-specific metadata
-    enriched_resources = []
-    for resource in resources:
-        enriched_resource = resource.copy()
-        enriched_resource['access_level'] = 'admin'
-        enriched_resource['accessible_by'] = request.user['email']
-        enriched_resources.append(enriched_resource)
+    email = g.user['email']
+    enriched_resources = [{**resource, 'accessible_by': email} for resource in ADMIN_RESOURCES]
     
-    return jsonify(format_api_response(
+    response = format_api_response(
         enriched_resources, 
         f"Retrieved {len(enriched_resources)} admin resources"
-    ))
+    )
+    return with_listing_cache_headers(response, etag)
 
 @app.route('/resources/all', methods=['GET'])
-@login_required
+@auth_required()
 def get_all_accessible_resources():
     """Get all resources accessible to the current user based on their role"""
-    user_role = request.user.get('role', 'user')
-    
-    accessible_resources = RESOURCES['user_documents'].copy()
+    etag = resource_listing_etag()
+    if request.if_none_match.contains_weak(etag):
+        return with_listing_cache_headers(Response(status=304), etag)
     
-    if user_role == 'admin':
-        accessible_resources.extend(RESOURCES['admin_resources'])
+    accessible_resources = ALL_RESOURCES if g.user_role == 'admin' else USER_RESOURCES
     
-    # Add metadata
-    enriched_resources = []
-    for resource in accessible_resources:
-        enriched_resource = resource.copy()
-        enriched_resource['access_level'] = 'admin' if resource.get('sensitive') else 'user'
-        enriched_resource['accessible_by'] = request.user['email']
-        enriched_resources.append(enriched_resource)
+    email = g.user['email']
+    enriched_resources = [{**resource, 'accessible_by': email} for resource in accessible_resources]
     
-    return jsonify(format_api_response(
+    response = format_api_response(
         enriched_resources, 
         f"Retrieved {len(enriched_resources)} accessible resources"
-    ))
+    )
+    return with_listing_cache_headers(response, etag)
 
 @app.route('/user/profile', methods=['GET'])
-@login_required
+@auth_required()
 def get_user_profile():
     """Get current user's profile and stats"""
-    user_role = request.user.get('role', 'user')
+    user_role = g.user_role
+    is_admin = user_role == 'admin'
     
     # Calculate user stats
-    total_user_resources = len(RESOURCES['user_documents'])
-    total_admin_resources = len(RESOURCES['admin_resources']) if user_role == 'admin' else 0
+    total_user_resources = USER_RESOURCE_COUNT
+    total_admin_resources = ADMIN_RESOURCE_COUNT if is_admin else 0
     
     stats = {
         'total_accessible_resources': total_user_resources + total_admin_resources,
         'user_resources': total_user_resources,
         'admin_resources': total_admin_resources,
         'role': user_role,
-        'last_accessed': datetime.utcnow().isoformat() + 'Z'
+        'last_accessed': now_iso()
     }
     
     profile_data = {
-        'user_info': {
-            'sub': request.user['sub'],
-            'email': request.user['email'],
-            'name': request.user['name'],
-            'picture': request.user.get('picture', ''),
-            'role': user_role
-        },
+        'user_info': user_info(g.user['sub'], g.user['email'], g.user['name'], g.user.get('picture', ''), user_role),
         'stats': stats,
-        'permissions': {
-            'can_access_user_resources': True,
-            'can_access_admin_resources': user_role == 'admin',
-            'can_manage_users': user_role == 'admin'
-        }
+        'permissions': ADMIN_PERMISSIONS if is_admin else USER_PERMISSIONS
     }
     
-    return jsonify(format_api_response(profile_data, "Profile retrieved successfully"))
+    return format_api_response(profile_data, "Profile retrieved successfully")
+
+# Admin payloads are static apart from their timestamps, so they are serialized once
+SYSTEM_STATS_BODY = static_api_response({
+    'total_resources': USER_RESOURCE_COUNT + ADMIN_RESOURCE_COUNT,
+    'user_resources_count': USER_RESOURCE_COUNT,
+    'admin_resources_count': ADMIN_RESOURCE_COUNT,
+    'system_uptime': '5 days, 12 hours',  # Mock data
+    'active_users': 15,  # Mock data
+    'total_api_calls': 1247,  # Mock data
+    'last_updated': TIMESTAMP_PLACEHOLDER
+}, "System statistics retrieved")
+
+# Mock user data
+USER_MANAGEMENT_BODY = static_api_response([
+    {
+        'id': 1,
+        'email': 'user1@example.com',
+        'name': 'Regular User',
+        'role': 'user',
+        'last_login': '2025-01-30T10:30:00Z',
+        'status': 'active'
+    },
+    {
+        'id': 2,
+        'email': 'admin@example.com',
+        'name': 'Admin User',
+        'role': 'admin',
+        'last_login': '2025-01-31T08:15:00Z',
+        'status': 'active'
+    },
+    {
+        'id': 3,
+        'email': 'user2@example.com',
+        'name': 'Another User',
+        'role': 'user',
+        'last_login': '2025-01-29T14:45:00Z',
+        'status': 'active'
+    }
+], "User list retrieved successfully")
 
 @app.route('/admin/stats', methods=['GET'])
-@login_required
-@admin_required
+@auth_required(role='admin')
 def get_system_stats():
     """Get system statistics (admin only)"""
-    stats = {
-        'total_resources': len(RESOURCES['user_documents']) + len(RESOURCES['admin_resources']),
-        'user_resources_count': len(RESOURCES['user_documents']),
-        'admin_resources_count': len(RESOURCES['admin_resources']),
-        'system_uptime': '5 days, 12 hours',  # Mock data
-        'active_users': 15,  # Mock data
-        'total_api_calls': 1247,  # Mock data
-        'last_updated': datetime.utcnow().isoformat() + 'Z'
-    }
-    
-    return jsonify(format_api_response(stats, "System statistics retrieved"))
+    return render_static_response(SYSTEM_STATS_BODY)
 
 @app.route('/admin/users', methods=['GET'])
-@login_required
-@admin_required
+@auth_required(role='admin')
 def get_user_management():
     """Get user management data (admin only)"""
-    # Mock user data
-    users = [
-        {
-            'id': 1,
-            'email': 'user1@example.com',
-            'name': 'Regular User',
-            'role': 'user',
-            'last_login': '2025-01-30T10:30:00Z',
-            'status': 'active'
-        },
-        {
-            'id': 2,
-            'email': 'admin@example.com',
-            'name': 'Admin User',
-            'role': 'admin',
-            'last_login': '2025-01-31T08:15:00Z',
-            'status': 'active'
-        },
-        {
-            'id': 3,
-            'email': 'user2@example.com',
-            'name': 'Another User',
-            'role': 'user',
-            'last_login': '2025-01-29T14:45:00Z',
-            'status': 'active'
-        }
-    ]
-    
-    return jsonify(format_api_response(users, "User list retrieved successfully"))
+    return render_static_response(USER_MANAGEMENT_BODY)
 
 if __name__ == '__main__':
     print("Starting Resource Service on port 5002")
-    app.run(debug=True, port=5002)
+    # Debugger and reloader are opt-in; threaded so concurrent requests don't queue
+    app.run(debug=os.environ.get('DEBUG') == '1', port=5002, threaded=True)
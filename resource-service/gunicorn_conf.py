@@ -0,0 +1,14 @@
+"""
+Gunicorn configuration for the Resource Service
+Run with: gunicorn -c gunicorn_conf.py app:app
+"""
+import multiprocessing
+
+bind = '127.0.0.1:5002'
+
+# gevent workers let many requests share a worker while others wait on I/O;
+# the worker count spreads JWT checks and response encoding across CPUs
+workers = multiprocessing.cpu_count() * 2 + 1
+worker_class = 'gevent'
+worker_connections = 1000
+keepalive = 5